@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 
 # --------------------------------------------------
 # Page config
@@ -17,15 +18,25 @@ This tool helps you **simulate scholarship allocation strategies**:
 # --------------------------------------------------
 # 1️⃣ Input: Scholarship costs
 # --------------------------------------------------
+@st.cache_resource
+def _default_costs():
+    """Starting cost table; shared across reruns since data_editor never mutates it."""
+    return pd.DataFrame({
+        "scholarship_amount": [500, 800, 1200],
+        "number_of_students": [20, 15, 10]
+    })
+
+
 st.subheader("📥 Define Scholarship Costs")
 
 cost_data = st.data_editor(
-    pd.DataFrame({
-        "scholarship_amount": [500, 800, 1200],
-        "number_of_students": [20, 15, 10]
-    }),
+    _default_costs(),
     num_rows="dynamic",
-    use_container_width=True
+    use_container_width=True,
+    column_config={
+        "scholarship_amount": st.column_config.NumberColumn(min_value=0),
+        "number_of_students": st.column_config.NumberColumn(min_value=0)
+    }
 )
 
 # --------------------------------------------------
@@ -74,108 +85,176 @@ if allow_partial and min_base > ceiling:
 # --------------------------------------------------
 # 4️⃣ Build student-level dataframe
 # --------------------------------------------------
-rows = []
-
-for _, row in cost_data.iterrows():
-    requested = min(row["scholarship_amount"], ceiling)
-
-    for i in range(int(row["number_of_students"])):
-        base_amount = min(requested, min_base) if allow_partial else requested
+def build_students(amounts, counts, ceiling, min_base, allow_partial):
+    """Expand (amount, count) groups into one row per student."""
+    # Allocation relies on non-negative costs so running totals only grow
+    amounts = np.clip(np.asarray(amounts, dtype=np.int64), 0, None)
+    # Negative counts mean no students, as range() would give
+    counts = np.clip(np.asarray(counts, dtype=np.int64), 0, None)
+
+    # Realistic amounts fit in int32, which halves the bytes per pass;
+    # fall back to int64 only when a capped amount does not
+    requested = np.minimum(amounts, min(ceiling, np.iinfo(np.int64).max))
+    dtype = np.int32 if requested.max(initial=0) <= np.iinfo(np.int32).max else np.int64
+    requested = requested.astype(dtype)
+
+    # One value per group, repeated out to one value per student
+    requested_expanded = np.repeat(requested, counts)
+    base_expanded = (
+        np.minimum(requested_expanded, min(min_base, np.iinfo(dtype).max))
+        if allow_partial else requested_expanded
+    )
 
-        rows.append({
-            "student_id": f"{requested}_{i+1}",
-            "requested": requested,
-            "base": base_amount,
-            "topup": requested - base_amount,
-            "allocated": 0
-        })
+    # Label "<requested>_<n>" with n counting from 1 within each group
+    group_starts = np.repeat(np.cumsum(counts, dtype=np.int64) - counts, counts)
+    within_group = np.arange(len(group_starts)) - group_starts + 1
+    student_ids = (
+        pd.Series(requested_expanded).astype(str)
+        .str.cat(pd.Series(within_group).astype(str), sep="_")
+    )
 
-df = pd.DataFrame(rows)
+    return pd.DataFrame({
+        "student_id": student_ids,
+        "requested": requested_expanded,
+        "base": base_expanded,
+        "topup": requested_expanded - base_expanded,
+        "allocated": np.zeros(len(requested_expanded), dtype=requested_expanded.dtype)
+    })
 
-if df.empty:
-    st.warning("Please enter at least one scholarship option.")
-    st.stop()
 
 # --------------------------------------------------
 # 5️⃣ Allocation logic
 # --------------------------------------------------
-budget_remaining = total_budget
-
-# Stage 1: Base funding (maximize coverage)
-for idx, row in df.iterrows():
-    if budget_remaining >= row["base"]:
-        df.at[idx, "allocated"] = row["base"]
-        budget_remaining -= row["base"]
-    else:
-        # Cannot fully fund base, stop allocation
-        break
-
-# Stage 2: Top-ups (strict: full top-ups only)
-if allow_partial:
-    topups = df[df["topup"] > 0].sort_values("topup")
-
-    for idx, row in topups.iterrows():
-        if budget_remaining >= row["topup"]:
-            df.at[idx, "allocated"] += row["topup"]
-            budget_remaining -= row["topup"]
-        else:
-            break  # Stop if budget cannot cover full top-up
-
-# --------------------------------------------------
-# 6️⃣ Metrics (corrected)
-# --------------------------------------------------
-funded_mask = df["allocated"] > 0
-
-funded_students = funded_mask.sum()
-fully_funded = (funded_mask & (df["allocated"] == df["requested"])).sum()
-partially_funded = (funded_mask & (df["allocated"] < df["requested"])).sum()
+def _fund_in_order(costs, budget):
+    """Number of leading ``costs`` that fit in ``budget``, and what they cost."""
+    cum = np.cumsum(costs, dtype=np.int64)
+    k = int(np.searchsorted(cum, budget, side="right"))
+    return k, (int(cum[k - 1]) if k else 0)
+
+
+@st.cache_data
+def allocate(amounts, counts, ceiling, min_base, allow_partial, total_budget):
+    """Build the students, fund bases in order, then full top-ups smallest first.
+
+    Takes plain hashable inputs so the cache key is cheap and exact. Returns
+    the student dataframe with ``allocated`` filled in and the budget left over.
+    """
+    df = build_students(amounts, counts, ceiling, min_base, allow_partial)
+    base = df["base"].to_numpy()
+    topup = df["topup"].to_numpy()
+
+    # Stage 1: Base funding (maximize coverage)
+    # Fund bases in order until the next one no longer fits
+    k, spent = _fund_in_order(base, total_budget)
+    alloc = base.copy()
+    alloc[k:] = 0
+    budget_remaining = total_budget - spent
+
+    # Stage 2: Top-ups (strict: full top-ups only)
+    if allow_partial:
+        idxs = np.flatnonzero(topup > 0)
+
+        # At most budget // smallest top-up can be funded, so when that is
+        # fewer than all candidates only the smallest ones need sorting
+        max_fit = budget_remaining // int(topup[idxs].min()) if len(idxs) else 0
+        if max_fit < len(idxs):
+            threshold = (
+                np.partition(topup[idxs], max_fit - 1)[max_fit - 1] if max_fit else 0
+            )
+            idxs = idxs[topup[idxs] <= threshold]
+
+        order = idxs[np.argsort(topup[idxs], kind="stable")]
+
+        # Smallest top-ups first; stop once budget cannot cover a full top-up
+        k, spent = _fund_in_order(topup[order], budget_remaining)
+        alloc[order[:k]] += topup[order[:k]]
+        budget_remaining -= spent
+
+    return df.assign(allocated=alloc), budget_remaining
+
+
+# Half-filled editor rows (a cleared or not-yet-entered cell) fund nobody
+filled_costs = cost_data.dropna(subset=["scholarship_amount", "number_of_students"])
+
+df, budget_remaining = allocate(
+    tuple(filled_costs["scholarship_amount"].tolist()),
+    tuple(filled_costs["number_of_students"].tolist()),
+    ceiling,
+    min_base,
+    allow_partial,
+    total_budget
+)
 
-# Consistency safeguard
-assert funded_students == fully_funded + partially_funded
+if df.empty:
+    st.warning("Please enter at least one scholarship option.")
+    st.stop()
 
 # --------------------------------------------------
-# 7️⃣ Display results
+# 6️⃣–9️⃣ Results
 # --------------------------------------------------
-st.subheader("📊 Results")
-
-col1, col2, col3, col4 = st.columns(4)
-col1.metric("Total Budget", f"{total_budget:,}")
-col2.metric("Students Funded", funded_students)
-col3.metric("Fully Funded", fully_funded)
-col4.metric("Partially Funded", partially_funded)
-
-st.metric("Budget Remaining", f"{budget_remaining:,}")
+def render_results(df, total_budget, budget_remaining):
+    """Show metrics, the allocation table and the coverage curve."""
+    # 6️⃣ Metrics (corrected)
+    alloc = df["allocated"].to_numpy()
+    req = df["requested"].to_numpy()
+
+    # 0 = unfunded, 1 = partial, 2 = full; counted in a single pass
+    funding_level = np.where(alloc == 0, 0, np.where(alloc == req, 2, 1)).astype(np.int8)
+    _, partially_funded, fully_funded = (
+        int(n) for n in np.bincount(funding_level, minlength=3)
+    )
+    funded_students = partially_funded + fully_funded
+
+    # Consistency safeguard: nobody receives more than they requested
+    assert (alloc <= req).all()
+
+    # 7️⃣ Display results
+    st.subheader("📊 Results")
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total Budget", f"{total_budget:,}")
+    col2.metric("Students Funded", funded_students)
+    col3.metric("Fully Funded", fully_funded)
+    col4.metric("Partially Funded", partially_funded)
+
+    st.metric("Budget Remaining", f"{budget_remaining:,}")
+
+    # 8️⃣ Allocation table
+    st.subheader("🎓 Allocation Details")
+
+    # Only the displayed columns are gathered; base/topup are never copied
+    funded_idx = np.flatnonzero(funding_level)
+    funded_alloc = alloc[funded_idx]
+    funded_req = req[funded_idx]
+
+    display_df = pd.DataFrame(
+        {
+            "student_id": df["student_id"].array[funded_idx],
+            "requested": funded_req,
+            "allocated": funded_alloc,
+            "status": np.where(funding_level[funded_idx] == 2, "Full", "Partial")
+        },
+        index=df.index[funded_idx]
+    )
 
-# --------------------------------------------------
-# 8️⃣ Allocation table
-# --------------------------------------------------
-st.subheader("🎓 Allocation Details")
+    st.dataframe(display_df, use_container_width=True)
 
-display_df = df[funded_mask].copy()
-display_df["status"] = display_df.apply(
-    lambda r: "Full" if r["allocated"] == r["requested"] else "Partial",
-    axis=1
-)
+    # 9️⃣ Cumulative Coverage Curve (CUSUM)
+    st.subheader("📈 Cumulative Coverage Curve")
 
-st.dataframe(
-    display_df[["student_id", "requested", "allocated", "status"]],
-    use_container_width=True
-)
+    # Sort by base funding (only the base values are needed, not the whole frame)
+    base_sorted = np.sort(df["base"].to_numpy())
+    cum_spend = np.cumsum(base_sorted, dtype=np.int64)
 
-# --------------------------------------------------
-# 9️⃣ Cumulative Coverage Curve (CUSUM)
-# --------------------------------------------------
-st.subheader("📈 Cumulative Coverage Curve")
+    # Limit to realistic budget for display (cum_spend is sorted, so cut at one point)
+    cutoff = np.searchsorted(cum_spend, max(total_budget, cum_spend[-1]), side="right")
+    cum_spend = cum_spend[:cutoff]
+    cum_students = np.arange(1, len(cum_spend) + 1, dtype=np.int32)
 
-# Sort by base funding
-curve_df = df.sort_values("base").copy()
-curve_df["cum_spend"] = curve_df["base"].cumsum()
-curve_df["cum_students"] = range(1, len(curve_df) + 1)
+    # Plot cumulative curve
+    st.line_chart(
+        pd.Series(cum_students, index=pd.Index(cum_spend, name="cum_spend"), name="cum_students")
+    )
 
-# Limit to realistic budget for display
-curve_df = curve_df[curve_df["cum_spend"] <= max(total_budget, curve_df["cum_spend"].max())]
 
-# Plot cumulative curve
-st.line_chart(
-    curve_df.set_index("cum_spend")["cum_students"]
-)
+render_results(df, total_budget, budget_remaining)